@@ -8,7 +8,8 @@ def _wrap_submit(func, instance, args, kwargs):
     properly propagated using an intermediate function.
     """
     # If there isn't a currently active context, then do not create one
-    # DEV: Calling `.active()` when there isn't an active context will create a new context
+    # DEV: `.active()` returns `None` when there isn't an active context, so a
+    #      single call covers both the lookup and the existence check.
     # DEV: We need to do this in case they are either:
     #        - Starting nested futures
     #        - Starting futures from outside of an existing context
@@ -17,9 +18,7 @@ def _wrap_submit(func, instance, args, kwargs):
     #
     #      The resolution is to not create/propagate a new context if one does not exist, but let the
     #      future's thread create the context instead.
-    current_ctx = None
-    if ddtrace.tracer.context_provider._has_active_context():
-        current_ctx = ddtrace.tracer.context_provider.active()
+    current_ctx = ddtrace.tracer.context_provider.active()
 
     # extract the target function that must be executed in
     # a new thread and the `target` arguments
@@ -1,9 +1,11 @@
-import gevent
+from gevent import getcurrent as _getcurrent
 
 from ...provider import BaseContextProvider
 
 
-# Greenlet attribute used to set/get the context
+# Greenlet attribute used to set/get the context. Storing the context on the
+# greenlet ties its lifetime to the greenlet and keeps lookups to a single
+# attribute read, without any per-call weak reference bookkeeping.
 CONTEXT_ATTR = "__datadog_context"
 
 
@@ -14,25 +16,23 @@ class GeventContextProvider(BaseContextProvider):
     context from one greenlet to another.
     """
 
-    def _get_current_context(self):
-        """Helper to get the active context from the current greenlet."""
-        current_g = gevent.getcurrent()
-        if current_g is not None:
-            return getattr(current_g, CONTEXT_ATTR, None)
-        return None
+    __slots__ = ()
 
     def _has_active_context(self):
         """Helper to determine if there is an active context."""
-        return self._get_current_context() is not None
+        current_g = _getcurrent()
+        return current_g is not None and getattr(current_g, CONTEXT_ATTR, None) is not None
 
     def activate(self, context):
         """Sets the active context for the current running ``Greenlet``."""
-        current_g = gevent.getcurrent()
+        current_g = _getcurrent()
         if current_g is not None:
             setattr(current_g, CONTEXT_ATTR, context)
             return context
 
     def active(self):
         """Returns the active context for this execution flow."""
-        ctx = self._get_current_context()
-        return ctx
+        current_g = _getcurrent()
+        if current_g is not None:
+            return getattr(current_g, CONTEXT_ATTR, None)
+        return None
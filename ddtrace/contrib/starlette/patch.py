@@ -41,10 +41,13 @@ def span_modifier(span, scope):
         span.resource = "{} {}".format(scope["method"], resource)
 
 
+# The middleware definition only holds the class and its options, so a single
+# instance can be shared by every application.
+_trace_middleware = Middleware(TraceMiddleware, integration_config=config.starlette, span_modifier=span_modifier)
+
+
 def traced_init(wrapped, instance, args, kwargs):
-    mw = kwargs.pop("middleware", [])
-    mw.insert(0, Middleware(TraceMiddleware, integration_config=config.starlette, span_modifier=span_modifier))
-    kwargs.update({"middleware": mw})
+    kwargs["middleware"] = [_trace_middleware, *(kwargs.get("middleware") or ())]
 
     wrapped(*args, **kwargs)
 
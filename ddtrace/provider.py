@@ -21,6 +21,8 @@ class BaseContextProvider(six.with_metaclass(abc.ABCMeta)):
     * the ``activate`` method, that sets the current active ``Context``
     """
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def _has_active_context(self):
         pass
@@ -6,7 +6,6 @@ import sys
 import threading
 from typing import Dict, List, Optional, Tuple, Union
 
-from ddtrace.vendor import attr
 from ddtrace.vendor import debtcollector
 
 from .constants import (
@@ -21,7 +20,7 @@ from .constants import (
 from .context import Context
 from .ext import system, SpanTypes
 from .ext.priority import AUTO_REJECT, AUTO_KEEP
-from .internal import debug, hostname
+from .internal import forksafe, hostname
 from .internal.logger import get_logger, hasHandlers
 from .internal.runtime import RuntimeTags, RuntimeWorker, get_runtime_id
 from .internal.writer import AgentWriter, LogWriter
@@ -53,7 +52,29 @@ if debug_mode and not hasHandlers(log):
         logging.basicConfig(level=logging.DEBUG)
 
 
-@attr.s()
+# Traces are guarded by a fixed table of locks selected by trace id instead of
+# allocating a new lock for every trace.
+_NUM_TRACE_LOCKS = 64
+_trace_locks = [threading.Lock() for _ in range(_NUM_TRACE_LOCKS)]
+
+# Incremented in the child process after every fork. Tracers compare it with
+# the value seen at their last check to detect that they are running in a new
+# process without calling getpid() for every span.
+_fork_generation = 0
+
+
+def _after_fork_in_child():
+    global _fork_generation
+    _fork_generation += 1
+
+    # A lock held by another thread at fork time would never be released in
+    # the child, blocking every trace mapped to it.
+    _trace_locks[:] = [threading.Lock() for _ in range(_NUM_TRACE_LOCKS)]
+
+
+forksafe.register(after_in_child=_after_fork_in_child)
+
+
 class _Trace(object):
     """Maintains the state of a trace (a collection of spans).
 
@@ -65,39 +86,50 @@ class _Trace(object):
     the client and hence this data structure.
     """
 
-    trace_id = attr.ib(type=int)  # type: int
-    """
-    The sampling decision made for the trace. This should only be set by the
-    library initially when the root span is created but for legacy reasons
-    can be set with the `span.sampled` property for any span in the trace.
-    """
-    sampled = attr.ib(type=bool, default=True)  # type: bool
-    """
-    The sampling priority decision for the trace. This is calculated by the library
-    when the root span of a trace is created but for legacy reasons can be set
-    with the `span.context.sampling_priority` attribute.
-    """
-    sampling_priority = attr.ib(default=None)  # type: Optional[int]
-    """
-    The origin of the trace. This is used in distributed tracing to indicate
-    the source of a request (eg. synthetics).
-    """
-    dd_origin = attr.ib(default=None)  # type: Optional[str]
-    """Number of spans finished in the trace."""
-    _num_finished = attr.ib(type=int, default=0)  # type: int
-    _spans = attr.ib(default=attr.Factory(list))  # type: List[Span]
-    _lock = attr.ib(type=threading.Lock, default=attr.Factory(threading.Lock))  # type: threading.Lock
+    __slots__ = [
+        "trace_id",
+        "sampled",
+        "sampling_priority",
+        "dd_origin",
+        "_num_finished",
+        "_spans",
+    ]
+
+    def __init__(self, trace_id, sampled=True, sampling_priority=None, dd_origin=None):
+        # type: (int, bool, Optional[int], Optional[str]) -> None
+        self.trace_id = trace_id
+        # The sampling decision made for the trace. This should only be set by the
+        # library initially when the root span is created but for legacy reasons
+        # can be set with the `span.sampled` property for any span in the trace.
+        self.sampled = sampled
+        # The sampling priority decision for the trace. This is calculated by the library
+        # when the root span of a trace is created but for legacy reasons can be set
+        # with the `span.context.sampling_priority` attribute.
+        self.sampling_priority = sampling_priority
+        # The origin of the trace. This is used in distributed tracing to indicate
+        # the source of a request (eg. synthetics).
+        self.dd_origin = dd_origin
+        # Number of spans finished in the trace.
+        self._num_finished = 0
+        self._spans = []  # type: List[Span]
 
+    @property
+    def _lock(self):
+        # type: () -> threading.Lock
+        return _trace_locks[hash(self.trace_id) % _NUM_TRACE_LOCKS]
+
+    # DEV: the span list is only ever appended to or replaced by a new list so
+    #      reads do not need the lock. Writes still do: an append racing with
+    #      finish_span could go to a list that is being replaced and be lost.
     def __len__(self):
-        with self._lock:
-            return len(self._spans)
+        return len(self._spans)
 
     @property
     def root_span(self):
         # type: () -> Optional[Span]
         """Returns the first span created in a trace."""
-        with self._lock:
-            return self._spans[0] if len(self._spans) else None
+        spans = self._spans
+        return spans[0] if spans else None
 
     def add_span(self, span):
         # type: (Span) -> None
@@ -109,23 +141,48 @@ class _Trace(object):
         with self._lock:
             self._num_finished += 1
 
-            if self._num_finished == len(self._spans) or (
-                partial_flush_enabled and self._num_finished >= partial_flush_min_spans
-            ):
-                finished_spans = [s for s in self._spans if s.finished]
+            if self._num_finished == len(self._spans):
+                # Every span of the trace is finished so they can all be
+                # flushed without checking them one by one.
+                finished_spans = self._spans
+                self._spans = []
+            elif partial_flush_enabled and self._num_finished >= partial_flush_min_spans:
+                # Split the spans in a single pass. The unfinished spans are
+                # moved to a new list so that readers holding the previous
+                # list never observe it changing.
+                finished_spans = []
+                unfinished_spans = []
+                for s in self._spans:
+                    if s.finished:
+                        finished_spans.append(s)
+                    else:
+                        unfinished_spans.append(s)
+                self._spans = unfinished_spans
+            else:
+                return [], False, False
 
+            if finished_spans:
                 chunk_root = finished_spans[0]
-                if chunk_root:
-                    if self.sampling_priority is not None and self.sampled:
-                        chunk_root.set_metric(SAMPLING_PRIORITY_KEY, self.sampling_priority)
-                    if self.dd_origin:
-                        chunk_root.meta[ORIGIN_KEY] = str(self.dd_origin)
+                if self.sampling_priority is not None and self.sampled:
+                    chunk_root.set_metric(SAMPLING_PRIORITY_KEY, self.sampling_priority)
+                if self.dd_origin:
+                    chunk_root.meta[ORIGIN_KEY] = str(self.dd_origin)
+
+            self._num_finished -= len(finished_spans)
+            return finished_spans, self.sampled, len(self._spans) == 0
+
+
+class _SpanPPrint(object):
+    """Defers ``Span.pprint()`` until a log record is actually formatted."""
 
-                self._spans = [s for s in self._spans if not s.finished]
-                self._num_finished -= len(finished_spans)
-                return finished_spans, self.sampled, len(self._spans) == 0
+    __slots__ = ["span"]
 
-            return [], False, False
+    def __init__(self, span):
+        # type: (Span) -> None
+        self.span = span
+
+    def __str__(self):
+        return self.span.pprint()
 
 
 def _parse_dogstatsd_url(url):
@@ -149,7 +206,7 @@ def _parse_dogstatsd_url(url):
         raise ValueError("Unknown scheme `%s` for DogStatsD URL `{}`".format(parsed.scheme))
 
 
-_INTERNAL_APPLICATION_SPAN_TYPES = ["custom", "template", "web", "worker"]
+_INTERNAL_APPLICATION_SPAN_TYPES = frozenset(["custom", "template", "web", "worker"])
 
 
 class Tracer(object):
@@ -187,6 +244,7 @@ class Tracer(object):
         self.priority_sampler = None
         self._runtime_worker = None
         self._filters = []
+        self._wrap_executor = None
         self._traces = {}  # type: Dict[int, _Trace]
         self._traces_lock = threading.Lock()
 
@@ -228,6 +286,8 @@ class Tracer(object):
         # Runtime id used for associating data collected during runtime to
         # traces
         self._pid = getpid()
+        self._runtime_id = get_runtime_id()
+        self._fork_generation = _fork_generation
 
         self.enabled = asbool(get_env("trace", "enabled", default=True))
 
@@ -252,13 +312,18 @@ class Tracer(object):
 
     def _get_or_create_trace(self, trace_id):
         # type: (int) -> _Trace
+        # DEV: reading from a dict is atomic so the lock is only needed when
+        #      the trace has to be created.
+        trace = self._traces.get(trace_id)
+        if trace is not None:
+            return trace
+
         with self._traces_lock:
-            if trace_id in self._traces:
-                return self._traces[trace_id]
-            else:
+            trace = self._traces.get(trace_id)
+            if trace is None:
                 trace = _Trace(trace_id=trace_id)
                 self._traces[trace_id] = trace
-                return trace
+            return trace
 
     def _is_sampled(self, span):
         # type: (Span) -> bool
@@ -488,6 +553,10 @@ class Tracer(object):
             self._start_runtime_worker()
 
         if debug_mode or asbool(environ.get("DD_TRACE_STARTUP_LOGS", False)):
+            # DEV: imported lazily, the debug module pulls in pkg_resources and
+            # platform which are only needed for start-up logs.
+            from .internal import debug
+
             try:
                 info = debug.collect(self)
             except Exception as e:
@@ -570,14 +639,15 @@ class Tracer(object):
 
             trace = self._get_or_create_trace(span.trace_id)
             trace.add_span(span)
-            # If the parent object has a sampling priority or origin defined
+            # If the parent context has a sampling priority or origin defined
             # then update the trace accordingly.
-            sampling_priority = getattr(child_of, "sampling_priority", None)
-            if sampling_priority is not None:
-                trace.sampling_priority = sampling_priority
-            dd_origin = getattr(child_of, "dd_origin", None)
-            if dd_origin is not None:
-                trace.dd_origin = dd_origin
+            # DEV: a local parent span already shares this trace, so only a
+            # propagated Context can carry new values.
+            if parent is None:
+                if child_of.sampling_priority is not None:
+                    trace.sampling_priority = child_of.sampling_priority
+                if child_of.dd_origin is not None:
+                    trace.dd_origin = child_of.dd_origin
         else:
             # this is the root span of a new trace
             span = Span(
@@ -588,13 +658,13 @@ class Tracer(object):
                 span_type=span_type,
                 _check_pid=False,
             )
-            span.metrics[system.PID] = self._pid or getpid()
-            span.meta["runtime-id"] = get_runtime_id()
+            span.metrics[system.PID] = self._pid
+            span.meta["runtime-id"] = self._runtime_id
             if config.report_hostname:
                 span.meta[HOSTNAME_KEY] = hostname.get_hostname()
             # add tags to root span to correlate trace with runtime metrics
             # only applied to spans with types that are internal to applications
-            if self._runtime_worker and self._is_span_internal(span):
+            if self._runtime_worker and (not span.span_type or span.span_type in _INTERNAL_APPLICATION_SPAN_TYPES):
                 span.meta["language"] = "python"
 
             sampled = self.sampler.sample(span)
@@ -642,18 +712,24 @@ class Tracer(object):
 
         # Only set the version tag on internal spans.
         if config.version:
-            root_span = self.active_root_span()
+            # DEV: use the span's own trace rather than the active one; the new
+            # span may already be activated and would otherwise be its own root.
+            root_span = trace.root_span
             # if: 1. the span is the root span and the span's service matches the global config; or
             #     2. the span is not the root, but the root span's service matches the span's service
             #        and the root span has a version tag
             # then the span belongs to the user application and so set the version tag
-            if (root_span is None and service == config.service) or (
+            if ((root_span is None or root_span is span) and service == config.service) or (
                 root_span and root_span.service == service and VERSION_KEY in root_span.meta
             ):
                 span._set_str_tag(VERSION_KEY, config.version)
 
         # update set of services handled by tracer
-        if service and service not in self._services and self._is_span_internal(span):
+        if (
+            service
+            and service not in self._services
+            and (not span.span_type or span.span_type in _INTERNAL_APPLICATION_SPAN_TYPES)
+        ):
             self._services.add(service)
 
             # The constant tags for the dogstatsd client needs to updated with any new
@@ -704,21 +780,23 @@ class Tracer(object):
         """Checks if the tracer is in a new process (was forked) and performs
         the necessary updates if it is a new process
         """
-        pid = getpid()
-        if self._pid == pid:
+        if self._fork_generation == _fork_generation:
             return
 
-        self._pid = pid
+        self._fork_generation = _fork_generation
+        self._pid = getpid()
+        self._runtime_id = get_runtime_id()
 
         # We have to reseed the RNG or we will get collisions between the processes as
         # they will share the seed and generate the same random numbers.
         _rand.seed()
 
         # The previous process is responsible for flushing the spans it created.
-        for trace_id, trace in self._traces:
+        for trace in self._traces.values():
             # Note that the remaining metadata is left in place so that
             # sampling decisions are not affected.
-            trace.spans = []
+            trace._spans = []
+            trace._num_finished = 0
 
         # Assume that the services of the child are not necessarily a subset of those
         # of the parent.
@@ -820,25 +898,25 @@ class Tracer(object):
         Send the trace to the writer to enqueue the spans list in the agent
         sending queue.
         """
-        if not spans:
+        writer = self.writer
+        if not spans or not self.enabled or not writer:
             return  # nothing to do
 
         if self.log.isEnabledFor(logging.DEBUG):
-            self.log.debug("writing %s spans (enabled:%s)", len(spans), self.enabled)
+            self.log.debug("writing %s spans", len(spans))
             for span in spans:
-                self.log.debug("\n%s", span.pprint())
+                self.log.debug("\n%s", _SpanPPrint(span))
 
-        if self.enabled and self.writer:
-            for filtr in self._filters:
-                try:
-                    spans = filtr.process_trace(spans)
-                except Exception:
-                    log.error("error while applying filter %s to traces", filtr, exc_info=True)
-                else:
-                    if not spans:
-                        return
+        for filtr in self._filters:
+            try:
+                spans = filtr.process_trace(spans)
+            except Exception:
+                log.error("error while applying filter %s to traces", filtr, exc_info=True)
+            else:
+                if not spans:
+                    return
 
-            self.writer.write(spans=spans)
+        writer.write(spans=spans)
 
     @deprecated(message="Manually setting service info is no longer necessary", version="1.0.0")
     def set_service_info(self, *args, **kwargs):
@@ -914,8 +992,9 @@ class Tracer(object):
                 def func_wrapper(*args, **kwargs):
                     # if a wrap executor has been configured, it is used instead
                     # of the default tracing function
-                    if getattr(self, "_wrap_executor", None):
-                        return self._wrap_executor(
+                    wrap_executor = self._wrap_executor
+                    if wrap_executor:
+                        return wrap_executor(
                             self,
                             f,
                             args,
@@ -927,8 +1006,23 @@ class Tracer(object):
                         )
 
                     # otherwise fallback to a default tracing
-                    with self.trace(span_name, service=service, resource=resource, span_type=span_type):
+                    # DEV: equivalent to ``with self.trace(...)`` without the
+                    # extra call and context manager protocol on every call
+                    span = self.start_span(
+                        span_name,
+                        child_of=self.active(),
+                        service=service,
+                        resource=resource,
+                        span_type=span_type,
+                        activate=True,
+                    )
+                    try:
                         return f(*args, **kwargs)
+                    except BaseException:
+                        span.set_exc_info(*sys.exc_info())
+                        raise
+                    finally:
+                        span.finish()
 
             return func_wrapper
 
@@ -970,7 +1064,3 @@ class Tracer(object):
             # We are in an AWS Lambda environment
             return True
         return False
-
-    @staticmethod
-    def _is_span_internal(span):
-        return not span.span_type or span.span_type in _INTERNAL_APPLICATION_SPAN_TYPES
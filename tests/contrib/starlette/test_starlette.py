@@ -8,11 +8,13 @@ import sqlalchemy
 import ddtrace
 from ddtrace import Pin
 from ddtrace import config
+from ddtrace.contrib.asgi.middleware import TraceMiddleware
 from ddtrace.contrib.starlette import patch as starlette_patch, unpatch as starlette_unpatch
 from ddtrace.contrib.sqlalchemy import patch as sql_patch, unpatch as sql_unpatch
 from ddtrace.propagation import http as http_propagation
 
 
+from starlette.applications import Starlette
 from starlette.testclient import TestClient
 from tests import override_http_config, snapshot
 from tests.tracer.test_tracer import get_dummy_tracer
@@ -451,3 +453,13 @@ def test_table_query_snapshot(snapshot_client):
     r_get = snapshot_client.get("/notes")
     assert r_get.status_code == 200
     assert r_get.text == "[{'id': 1, 'text': 'test', 'completed': 1}]"
+
+
+def test_unpatch():
+    starlette_patch()
+    app = Starlette()
+    assert [m.cls for m in app.user_middleware] == [TraceMiddleware]
+
+    starlette_unpatch()
+    app = Starlette()
+    assert app.user_middleware == []